@@ -20,3 +20,12 @@ MAX_HP_ADDRESSES = [0xD18D, 0xD1B9, 0xD1E5, 0xD211, 0xD23D, 0xD269]
 MONEY_ADDRESS_1 = 0xD347
 MONEY_ADDRESS_2 = 0xD348
 MONEY_ADDRESS_3 = 0xD349
+
+BATTLE_TYPE_ADDRESS = 0xD057  # 0 = not in battle, 1 = wild, 2 = trainer
+TILE_MAP_ADDRESS = 0xC3A0  # 20x18 buffer of the tiles currently on screen
+SCREEN_WIDTH_TILES, SCREEN_HEIGHT_TILES = 20, 18
+TEXT_BOX_CORNER_TILE = 0x79  # Top left border tile of the dialogue box
+TEXT_BOX_TOP_ROW = 12  # Tile row of the dialogue box's top border
+WRAM_START_ADDRESS, WRAM_END_ADDRESS = 0xC000, 0xE000
+WALK_COUNTER_ADDRESS = 0xCFC5  # Frames left in the current overworld step, 0 when standing
+SCY_ADDRESS, SCX_ADDRESS = 0xFF42, 0xFF43  # Background scroll registers
@@ -1,51 +1,121 @@
+from collections import OrderedDict
 from typing import Optional
 import base64
-import ollama
 from fastapi import HTTPException
 import json
 import os
+import threading
 
+from backend_pool import BackendPool
 from conversation_memory import ConversationMemory
+from conversation_store import ConversationStore
+
+DEFAULT_SESSION = "default"
 
 class LLMAgent:
     def __init__(self, 
                  model: str, 
                  context_size: int = 2048,
                  pre_prompt_path: Optional[str] = None,
-                 image_model: Optional[str] = None):
+                 image_model: Optional[str] = None,
+                 backend_pool: Optional[BackendPool] = None,
+                 image_backend_pool: Optional[BackendPool] = None,
+                 store: Optional[ConversationStore] = None,
+                 max_active_sessions: int = 64,
+                 keep_alive: Optional[str] = None):
         self.model = model
+        self.keep_alive = keep_alive
         self.image_model = image_model
         self.context_size = context_size
 
+        # The image model may live on different hosts than the main model.
+        self.backend_pool = backend_pool or BackendPool()
+        self.image_backend_pool = image_backend_pool or self.backend_pool
+
         # Read pre-prompt from file if path is provided
-        pre_prompt = None
+        self.pre_prompt = None
         if pre_prompt_path and os.path.exists(pre_prompt_path):
             with open(pre_prompt_path, 'r') as f:
-                pre_prompt = f.read().strip()
+                self.pre_prompt = f.read().strip()
         elif pre_prompt_path:
             raise FileNotFoundError(f"Pre-prompt file not found at {pre_prompt_path}")
-        
-        self.memory = ConversationMemory(
-            max_tokens=context_size, 
-            pre_prompt=pre_prompt
+
+        # Only recently used sessions are kept in RAM. With a store the rest are reloaded
+        # from disk on their next request; without one their history is dropped.
+        self.store = store
+        self.max_active_sessions = max_active_sessions
+        self.sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+        # Sessions are used by request threads and the keyboard thread
+        self._sessions_lock = threading.Lock()
+
+    def warm_up(self) -> bool:
+        """Preload the models. True if each one is loaded on at least one backend."""
+        loaded = self.backend_pool.preload(self.model, keep_alive=self.keep_alive)
+        if self.image_model:
+            loaded = self.image_backend_pool.preload(self.image_model, keep_alive=self.keep_alive) and loaded
+        return loaded
+
+    @property
+    def memory(self) -> ConversationMemory:
+        return self.get_memory(DEFAULT_SESSION)
+
+    def get_memory(self, session_id: Optional[str] = None) -> ConversationMemory:
+        session_id = session_id or DEFAULT_SESSION
+        with self._sessions_lock:
+            if session_id in self.sessions:
+                self.sessions.move_to_end(session_id)
+                return self.sessions[session_id]
+
+            memory = ConversationMemory(
+                max_tokens=self.context_size, 
+                pre_prompt=self.pre_prompt,
+                store=self.store,
+                session_id=session_id
+            )
+            self.sessions[session_id] = memory
+            while len(self.sessions) > self.max_active_sessions:
+                self.sessions.popitem(last=False)
+            return memory
+
+    def _active_sessions(self):
+        with self._sessions_lock:
+            return list(self.sessions.items())
+
+    def clear_memory(self):
+        """Clear every session, including the ones only on disk."""
+        for _, memory in self._active_sessions():
+            memory.clear()
+        if self.store:
+            self.store.clear_all()
+
+    def format_memory(self) -> str:
+        sessions = self._active_sessions()
+        if not sessions:
+            return "No active sessions."
+        return "\n\n".join(
+            f"Session {session_id}\n{memory}" for session_id, memory in sessions
         )
     
-    def generate_response(self, prompt: str, image_data: Optional[bytes] = None):
+    def generate_response(self, prompt: str, image_data: Optional[bytes] = None, session_id: Optional[str] = None):
         try:
+            memory = self.get_memory(session_id)
+
             # If an image model is provided, use it to process image data
             # TODO: image_prompt and image_model num_ctx should be configurable
             if image_data and self.image_model:
                 image_prompt = 'Describe the image'
                 image_base64 = base64.b64encode(image_data).decode('utf-8')
-                image_to_text_response = ollama.chat(
+                image_to_text_response = self.image_backend_pool.chat(
+                    session_id=session_id,
                     model=self.image_model, 
                     messages=[{'role': 'user', 'content': image_prompt, 'images': [image_data]}],
+                    keep_alive=self.keep_alive,
                     #options={'num_ctx': self.context_size,}
                 )
 
                 prompt += " " + image_to_text_response['message']['content']
 
-            messages = self.memory.get_context() + [{'role': 'user', 'content': prompt}]
+            messages = memory.get_context() + [{'role': 'user', 'content': prompt}]
             
             if image_data and not self.image_model:
                 image_base64 = base64.b64encode(image_data).decode('utf-8')
@@ -53,10 +123,11 @@ class LLMAgent:
             
             def generate():
                 full_response = ""
-                for chunk in ollama.chat(
+                for chunk in self.backend_pool.chat_stream(
+                    session_id=session_id,
                     model=self.model, 
                     messages=messages,
-                    stream=True,
+                    keep_alive=self.keep_alive,
                     options={'num_ctx': self.context_size}
                 ):
                     if chunk.get('message', {}).get('content'):
@@ -64,7 +135,7 @@ class LLMAgent:
                         full_response += response_chunk
                         yield json.dumps({"response": response_chunk}) + "\n"
                 
-                self.memory.add_exchange(prompt, full_response)
+                memory.add_exchange(prompt, full_response, image=image_data)
             
             return generate()
         
@@ -8,30 +8,45 @@ import threading
 import signal
 import uvicorn
 import asyncio
+import time
 
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
 from agent import LLMAgent
-from config import read_config
+from backend_pool import BackendPool
+from config import AgentConfig
+from conversation_store import ConversationStore
 
 class ChatRequest(BaseModel):
     prompt: str
     image: Optional[str] = None
+    session_id: Optional[str] = None
 
 class WebService:
-    def __init__(self, llm_agent):
+    def __init__(self, llm_agent, preload: bool = True, warm_up_retry: float = 10.0):
         self.app = FastAPI()
         self.llm_agent = llm_agent
+        self.preload = preload
+        self.warm_up_retry = warm_up_retry
+        self.ready = threading.Event() # Set once the models are loaded
         
-        # Store original terminal settings
-        self.original_terminal_settings = termios.tcgetattr(sys.stdin)
+        # Store original terminal settings. Without a terminal (e.g. run by a load test)
+        # there are no keyboard controls.
+        self.interactive = sys.stdin.isatty()
+        self.original_terminal_settings = termios.tcgetattr(sys.stdin) if self.interactive else None
         
         self.setup_routes()
     
     def setup_routes(self):
+        @self.app.get("/ready")
+        async def ready_endpoint():
+            if not self.ready.is_set():
+                return JSONResponse({"ready": False}, status_code=503)
+            return {"ready": True}
+
         @self.app.post("/chat")
         async def chat_endpoint(request: ChatRequest):
             try:
@@ -40,7 +55,8 @@ class WebService:
                 return StreamingResponse(
                     self.llm_agent.generate_response(
                         prompt=request.prompt, 
-                        image_data=image_data
+                        image_data=image_data,
+                        session_id=request.session_id
                     ), 
                     media_type="text/event-stream"
                 )
@@ -49,7 +65,8 @@ class WebService:
                 raise HTTPException(status_code=500, detail=str(e))
 
     def restore_terminal_settings(self, *args, **kwargs):
-        termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.original_terminal_settings)
+        if self.interactive:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.original_terminal_settings)
         exit(0)
     
     async def async_keyboard_handler(self):
@@ -71,9 +88,11 @@ class WebService:
 
                 if c == 'c':
                     # For example, clear memory or perform any other operation
-                    self.llm_agent.memory.clear()
+                    self.llm_agent.clear_memory()
                 elif c == 'p':
-                    print(str(self.llm_agent.memory))
+                    print(self.llm_agent.format_memory())
+                elif c == 'b':
+                    print(str(self.llm_agent.backend_pool))
         finally:
             self.restore_terminal_settings()
 
@@ -83,13 +102,24 @@ class WebService:
             daemon=True
         ).start()
     
+    def warm_up(self):
+        # Not ready until the models are loaded somewhere; keep trying until they are.
+        while self.preload and not self.llm_agent.warm_up():
+            print(f"Model preload failed, retrying in {self.warm_up_retry}s")
+            time.sleep(self.warm_up_retry)
+        self.ready.set()
+
     def run(self, host: str, port):
-        # Register signal handlers to restore terminal settings
-        signal.signal(signal.SIGINT, self.restore_terminal_settings)
-        signal.signal(signal.SIGTERM, self.restore_terminal_settings)
-        
-        # Start keyboard monitoring thread
-        self.start_keyboard_handler()
+        if self.interactive:
+            # Register signal handlers to restore terminal settings
+            signal.signal(signal.SIGINT, self.restore_terminal_settings)
+            signal.signal(signal.SIGTERM, self.restore_terminal_settings)
+            
+            # Start keyboard monitoring thread
+            self.start_keyboard_handler()
+
+        # Load models in the background so the server is up while they load
+        threading.Thread(target=self.warm_up, daemon=True).start()
         
         # Run the server
         uvicorn.run(
@@ -99,34 +129,45 @@ class WebService:
         )
 
 def main():
-    # TODO: classes here should have builders which read config.
-
-    # Get model name and size from config file
-    model = read_config("Agent", "model", default="gemma3:4b", value_type=str)
+    config = AgentConfig.load()
 
-    # Optional text model, for non multi-modal models that can't handle images.
-    image_model = read_config("Agent", "image_model", default=None, value_type=str)
+    # Construct path to preprompt.txt relative to this file
+    pre_prompt_path = os.path.join(os.path.dirname(__file__), config.pre_prompt)
 
-    # Get preprompt filename
-    pre_prompt = read_config("Agent", "pre_prompt", default="preprompt.txt", value_type=str)
+    backend_pool = BackendPool(
+        config.hosts,
+        health_interval=config.health_interval,
+        max_sessions=config.max_active_sessions
+    )
+    image_backend_pool = (
+        BackendPool(
+            config.image_hosts,
+            health_interval=config.health_interval,
+            max_sessions=config.max_active_sessions
+        )
+        if config.image_hosts else backend_pool
+    )
+    backend_pool.start_health_checks()
+    image_backend_pool.start_health_checks()
 
-    # Construct path to preprompt.txt relative to this file
-    pre_prompt_path = os.path.join(os.path.dirname(__file__), pre_prompt)
+    store = ConversationStore(config.history_db) if config.history_db else None
 
     # Create LLM Agent
-    context_size = read_config("Agent", "context_size", default=2048, value_type=int)
     llm_agent = LLMAgent(
-        model=model,
+        model=config.model,
         pre_prompt_path=pre_prompt_path,
-        context_size=context_size,
-        image_model=image_model
+        context_size=config.context_size,
+        image_model=config.image_model,
+        backend_pool=backend_pool,
+        image_backend_pool=image_backend_pool,
+        store=store,
+        max_active_sessions=config.max_active_sessions,
+        keep_alive=config.keep_alive
     )
     
     # Create and run web service
-    host = read_config("Agent", "host", default="0.0.0.0", value_type=str) 
-    port = read_config("Agent", "port", default=8000, value_type=int)
-    web_service = WebService(llm_agent)
-    web_service.run(host=host, port=port)
+    web_service = WebService(llm_agent, preload=config.preload)
+    web_service.run(host=config.host, port=config.port)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import queue
+import traceback
+from multiprocessing import Process, Queue
+from typing import List, Optional, Tuple
+
+import httpx
+
+from config import read_config
+from game_service import GameService
+
+
+class AsyncGameRuntime:
+    """
+    Drives many game services from one event loop, instead of one blocking process each.
+
+    Emulators keep running in their own processes and talk to the runtime through their
+    multiprocessing queues, which are polled without blocking. Each session has at most
+    one decision in flight and waits for room in its command queue before sending, so a
+    slow emulator never has work piling up for it. A semaphore caps how many decisions
+    (HTTP streams to the agent) run at the same time across all sessions. An error in one
+    session is logged and retried without affecting the others, and a session ends when
+    its emulator process exits.
+    """
+
+    def __init__(self,
+                 max_concurrent_requests: int = 8,
+                 poll_interval: float = 0.02,
+                 retry_delay: float = 1.0):
+        self.max_concurrent_requests = max_concurrent_requests
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.sessions: List[Tuple[GameService, Optional[Process]]] = []
+        self.decisions = 0
+        self.failures = 0
+
+    def add_session(self, service: GameService, process: Optional[Process] = None):
+        self.sessions.append((service, process))
+
+    async def _next_frame(self, service: GameService, process: Optional[Process]) -> Optional[tuple]:
+        while True:
+            try:
+                return service.data_queue.get_nowait()
+            except queue.Empty:
+                if process is not None and not process.is_alive():
+                    return None
+                await asyncio.sleep(self.poll_interval)
+
+    async def _send_command(self, service: GameService, command: str):
+        while True:
+            try:
+                service.command_queue.put_nowait(command)
+                return
+            except queue.Full:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _decide(self, service: GameService, process: Optional[Process], frame: tuple,
+                      client, semaphore) -> Optional[str]:
+        # The emulator only captures again after a command, so keep retrying this frame.
+        # The prompt is prepared once and reused, since preparing it has side effects.
+        prepared = None
+        while process is None or process.is_alive():
+            try:
+                if prepared is None:
+                    prepared = service.prepare_decision(frame)
+                async with semaphore:
+                    command = await service.decide_async(prepared, client)
+                if command is not None:
+                    return command
+            except Exception:
+                service.log("Decision failed:")
+                traceback.print_exc()
+            self.failures += 1
+            await asyncio.sleep(self.retry_delay)
+        return None
+
+    async def _run_session(self, service: GameService, process: Optional[Process], client, semaphore):
+        while True:
+            frame = await self._next_frame(service, process)
+            command = await self._decide(service, process, frame, client, semaphore) if frame else None
+            if command is None:
+                if process is not None:
+                    service.log(f"Emulator process {process.pid} exited with {process.exitcode}")
+                return
+            self.decisions += 1
+            await self._send_command(service, command)
+
+    async def run(self):
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        limits = httpx.Limits(max_connections=self.max_concurrent_requests)
+        async with httpx.AsyncClient(limits=limits) as client:
+            results = await asyncio.gather(
+                *(self._run_session(service, process, client, semaphore)
+                  for service, process in self.sessions),
+                return_exceptions=True,
+            )
+        for result in results:
+            if isinstance(result, BaseException):
+                traceback.print_exception(type(result), result, result.__traceback__)
+
+
+def main():
+    from game import make_game_service, run_game_instance
+
+    gamefile = read_config("Settings", "gamefile", default="emulation/game.gb")
+    sessions = read_config("Runtime", "sessions", default=1, value_type=int)
+    runtime = AsyncGameRuntime(
+        max_concurrent_requests=read_config("Runtime", "max_concurrent_requests", default=8, value_type=int),
+        poll_interval=read_config("Runtime", "poll_interval", default=0.02, value_type=float),
+    )
+
+    # One emulator process per session; all agent traffic goes through this process.
+    # Not daemonic, since an emulator may start its own lookahead pool.
+    processes = []
+    for i in range(sessions):
+        command_queue, data_queue = Queue(maxsize=100), Queue(maxsize=1)
+        process = Process(target=run_game_instance, args=(gamefile, command_queue, data_queue))
+        process.start()
+        processes.append((process, command_queue))
+        runtime.add_session(
+            make_game_service(command_queue, data_queue, session_id=f"game-{i}"), process
+        )
+
+    try:
+        asyncio.run(runtime.run())
+    finally:
+        shutdown(processes)
+
+
+def shutdown(processes, timeout: float = 5.0):
+    """Ask each emulator to exit cleanly, so it can close its lookahead pool, then force it."""
+    for process, command_queue in processes:
+        try:
+            command_queue.put_nowait("EXIT")
+        except queue.Full:
+            pass
+    for process, _ in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, List, Optional
+
+import httpx
+import ollama
+
+
+# Errors that mean "this server is in trouble" rather than "this request is bad"
+_BACKEND_ERRORS = (ollama.ResponseError, ConnectionError, OSError, httpx.TransportError)
+
+
+class BackendUnavailableError(RuntimeError):
+    pass
+
+
+class ModelBackend:
+    def __init__(self, host: Optional[str] = None, health_timeout: float = 5.0):
+        # host=None lets the ollama client fall back to OLLAMA_HOST / localhost
+        self.host = host
+        self.client = ollama.Client(host=host)
+        # Separate client with a timeout, so a hung host can't stall the health loop
+        self.health_client = ollama.Client(host=host, timeout=health_timeout)
+        self.outstanding = 0
+        self.healthy = True
+
+    def check_health(self) -> bool:
+        try:
+            self.health_client.list()
+            self.healthy = True
+        except Exception:
+            self.healthy = False
+        return self.healthy
+
+    def __repr__(self) -> str:
+        state = "up" if self.healthy else "down"
+        return f"ModelBackend({self.host or 'default'}, {state}, outstanding={self.outstanding})"
+
+
+class BackendPool:
+    """
+    A set of model servers that requests are spread across.
+
+    Routing picks the healthy backend with the fewest outstanding requests. A session
+    sticks to the backend it last used so that the server's KV cache for its context
+    stays warm, unless that backend is down or busier than the least loaded one by more
+    than max_affinity_skew requests. Only the last max_sessions sessions are remembered.
+    Failed calls mark the backend down and are retried on the next candidate; a
+    background thread brings backends back once they answer.
+    """
+
+    def __init__(self,
+                 hosts: Optional[List[Optional[str]]] = None,
+                 health_interval: float = 10.0,
+                 max_affinity_skew: int = 2,
+                 health_timeout: float = 5.0,
+                 max_sessions: int = 64):
+        self.backends = [ModelBackend(host, health_timeout) for host in (hosts or [None])]
+        self.health_interval = health_interval
+        self.max_affinity_skew = max_affinity_skew
+        self.max_sessions = max_sessions
+        self._affinity: "OrderedDict[str, ModelBackend]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    def start_health_checks(self):
+        if self._health_thread is not None or len(self.backends) < 2:
+            return
+
+        def loop():
+            while True:
+                for backend in self.backends:
+                    backend.check_health()
+                time.sleep(self.health_interval)
+
+        self._health_thread = threading.Thread(target=loop, daemon=True)
+        self._health_thread.start()
+
+    def acquire(self, session_id: Optional[str] = None, exclude=()) -> ModelBackend:
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                raise BackendUnavailableError("No model backend left to try")
+
+            # If every backend looks down, still try them; the health flag may be stale.
+            healthy = [b for b in candidates if b.healthy] or candidates
+            backend = min(healthy, key=lambda b: b.outstanding)
+
+            sticky = self._affinity.get(session_id) if session_id is not None else None
+            if (sticky in healthy and
+                    sticky.outstanding - backend.outstanding <= self.max_affinity_skew):
+                backend = sticky
+
+            if session_id is not None:
+                self._affinity[session_id] = backend
+                self._affinity.move_to_end(session_id)
+                while len(self._affinity) > self.max_sessions:
+                    self._affinity.popitem(last=False)
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend: ModelBackend):
+        with self._lock:
+            backend.outstanding -= 1
+
+    def mark_failed(self, backend: ModelBackend):
+        with self._lock:
+            backend.healthy = False
+
+    def chat(self, session_id: Optional[str] = None, **kwargs) -> dict:
+        tried = []
+        last_error = None
+        while True:
+            if len(tried) == len(self.backends):
+                raise BackendUnavailableError("No model backend left to try") from last_error
+            backend = self.acquire(session_id, exclude=tried)
+            try:
+                return backend.client.chat(**kwargs)
+            except _BACKEND_ERRORS as e:
+                if isinstance(e, ollama.ResponseError) and e.status_code < 500:
+                    raise
+                last_error = e
+                self.mark_failed(backend)
+                tried.append(backend)
+            finally:
+                self.release(backend)
+
+    def chat_stream(self, session_id: Optional[str] = None, **kwargs) -> Iterator[dict]:
+        """
+        Streaming chat. Failover only happens before the first chunk arrives; once output
+        has been yielded a failure is raised to the caller instead of replaying the request.
+        """
+        tried = []
+        last_error = None
+        while True:
+            if len(tried) == len(self.backends):
+                raise BackendUnavailableError("No model backend left to try") from last_error
+            backend = self.acquire(session_id, exclude=tried)
+            started = False
+            try:
+                for chunk in backend.client.chat(stream=True, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except _BACKEND_ERRORS as e:
+                if started or (isinstance(e, ollama.ResponseError) and e.status_code < 500):
+                    raise
+                last_error = e
+                self.mark_failed(backend)
+                tried.append(backend)
+            finally:
+                self.release(backend)
+
+    def preload(self, model: str, keep_alive: Optional[str] = None) -> bool:
+        """
+        Load a model into memory on every backend, so the first real request skips it.
+        Returns True if at least one backend has the model loaded.
+        """
+        loaded = False
+        for backend in self.backends:
+            try:
+                # A generate call without a prompt only loads the model
+                backend.client.generate(model=model, keep_alive=keep_alive)
+                loaded = True
+            except _BACKEND_ERRORS as e:
+                print(f"Could not preload {model} on {backend.host or 'default host'}: {e}")
+                # A 4xx (e.g. model not pulled) says nothing about the host's health
+                if not (isinstance(e, ollama.ResponseError) and e.status_code < 500):
+                    self.mark_failed(backend)
+        return loaded
+
+    def __str__(self) -> str:
+        return "\n".join(repr(b) for b in self.backends)
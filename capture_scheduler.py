@@ -0,0 +1,120 @@
+import zlib
+from typing import Dict, NamedTuple, Tuple
+
+from pyboy import PyBoy
+
+from address_constants import (
+    BATTLE_TYPE_ADDRESS,
+    MAP_N_ADDRESS,
+    SCX_ADDRESS,
+    SCY_ADDRESS,
+    SCREEN_HEIGHT_TILES,
+    SCREEN_WIDTH_TILES,
+    TEXT_BOX_CORNER_TILE,
+    TEXT_BOX_TOP_ROW,
+    TILE_MAP_ADDRESS,
+    WALK_COUNTER_ADDRESS,
+    X_POS_ADDRESS,
+    Y_POS_ADDRESS,
+)
+from config import read_config
+
+# (min ticks, max ticks) to wait after a command, per screen type
+DEFAULT_BOUNDS = {
+    "overworld": (8, 120),
+    "text": (4, 300),
+    "battle": (8, 300),
+}
+
+
+class Signature(NamedTuple):
+    """The parts of the game state that show whether it is still changing."""
+    map_n: int
+    x: int
+    y: int
+    battle: int
+    tiles: bytes
+    walk_counter: int
+    scx: int
+    scy: int
+    screen_crc: int
+
+
+class CaptureScheduler:
+    """
+    Decides when the game has settled after a command, instead of always waiting a fixed
+    number of ticks. The game has settled once the signature has not changed for
+    stable_ticks frames, the player is not mid step, and the minimum for the current
+    screen type has passed. The maximum caps the wait for screens that never settle.
+    """
+
+    def __init__(self,
+                 stable_ticks: int = 6,
+                 bounds: Dict[str, Tuple[int, int]] = DEFAULT_BOUNDS):
+        self.stable_ticks = stable_ticks
+        self.bounds = bounds
+        self.pending = False
+        self.screen = None # Screen type seen on the last tick
+        self._ticks = 0
+        self._stable = 0
+        self._signature = None
+
+    @classmethod
+    def from_config(cls):
+        bounds = {
+            screen: (
+                read_config("Capture", f"{screen}_min", default=low, value_type=int),
+                read_config("Capture", f"{screen}_max", default=high, value_type=int),
+            )
+            for screen, (low, high) in DEFAULT_BOUNDS.items()
+        }
+        stable_ticks = read_config("Capture", "stable_ticks", default=6, value_type=int)
+        return cls(stable_ticks=stable_ticks, bounds=bounds)
+
+    def start(self):
+        """Begin waiting for the game to settle, e.g. right after a button press."""
+        self.pending = True
+        self._ticks = 0
+        self._stable = 0
+        self._signature = None
+
+    def _read_signature(self, pyboy: PyBoy) -> Signature:
+        tiles = pyboy.memory[TILE_MAP_ADDRESS:TILE_MAP_ADDRESS + SCREEN_WIDTH_TILES * SCREEN_HEIGHT_TILES]
+        return Signature(
+            map_n=pyboy.memory[MAP_N_ADDRESS],
+            x=pyboy.memory[X_POS_ADDRESS],
+            y=pyboy.memory[Y_POS_ADDRESS],
+            battle=pyboy.memory[BATTLE_TYPE_ADDRESS],
+            tiles=bytes(tiles),
+            walk_counter=pyboy.memory[WALK_COUNTER_ADDRESS],
+            scx=pyboy.memory[SCX_ADDRESS],
+            scy=pyboy.memory[SCY_ADDRESS],
+            screen_crc=zlib.crc32(pyboy.screen.ndarray),
+        )
+
+    @staticmethod
+    def screen_type(signature: Signature) -> str:
+        if signature.battle:
+            return "battle"
+        if signature.tiles[TEXT_BOX_TOP_ROW * SCREEN_WIDTH_TILES] == TEXT_BOX_CORNER_TILE:
+            return "text"
+        return "overworld"
+
+    def tick(self, pyboy: PyBoy) -> bool:
+        """Call once per emulator tick. Returns True when the state should be captured."""
+        if not self.pending:
+            return False
+
+        self._ticks += 1
+        signature = self._read_signature(pyboy)
+        self._stable = self._stable + 1 if signature == self._signature else 0
+        self._signature = signature
+
+        self.screen = self.screen_type(signature)
+        min_ticks, max_ticks = self.bounds[self.screen]
+        walking = signature.walk_counter != 0
+        settled = not walking and self._stable >= self.stable_ticks and self._ticks >= min_ticks
+        if settled or self._ticks >= max_ticks:
+            self.pending = False
+            return True
+        return False
@@ -1,9 +1,19 @@
 import configparser
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional
 
 
-def read_config(section, option, default=None, value_type=str):
+@lru_cache(maxsize=None)
+def load_config(path: str = "config.ini") -> configparser.ConfigParser:
+    # Parsed once per process; call load_config.cache_clear() to pick up edits.
     config = configparser.ConfigParser()
-    config.read("config.ini")
+    config.read(path)
+    return config
+
+
+def read_config(section, option, default=None, value_type=str):
+    config = load_config()
 
     try:
         if value_type == bool:
@@ -16,3 +26,48 @@ def read_config(section, option, default=None, value_type=str):
             return config.get(section, option, fallback=default)
     except (configparser.NoSectionError, configparser.NoOptionError):
         return default
+
+
+def read_list(section, option) -> List[str]:
+    values = read_config(section, option, default="", value_type=str)
+    return [value.strip() for value in values.split(",") if value.strip()]
+
+
+@dataclass(frozen=True)
+class AgentConfig:
+    model: str = "gemma3:4b"
+    # Optional text model, for non multi-modal models that can't handle images.
+    image_model: Optional[str] = None
+    pre_prompt: str = "preprompt.txt"
+    context_size: int = 2048
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # Model servers to spread requests across. Empty means the default ollama host.
+    hosts: List[str] = field(default_factory=list)
+    image_hosts: List[str] = field(default_factory=list)
+    health_interval: float = 10.0
+    # Optional on-disk conversation history. Empty keeps history in memory only.
+    history_db: str = ""
+    max_active_sessions: int = 64
+    # Load the models on boot and keep them resident between requests
+    preload: bool = True
+    keep_alive: str = "30m"
+
+    @classmethod
+    def load(cls) -> "AgentConfig":
+        section = "Agent"
+        return cls(
+            model=read_config(section, "model", default=cls.model),
+            image_model=read_config(section, "image_model", default=None) or None,
+            pre_prompt=read_config(section, "pre_prompt", default=cls.pre_prompt),
+            context_size=read_config(section, "context_size", default=cls.context_size, value_type=int),
+            host=read_config(section, "host", default=cls.host),
+            port=read_config(section, "port", default=cls.port, value_type=int),
+            hosts=read_list(section, "hosts"),
+            image_hosts=read_list(section, "image_hosts"),
+            health_interval=read_config(section, "health_interval", default=cls.health_interval, value_type=float),
+            history_db=read_config(section, "history_db", default=cls.history_db),
+            max_active_sessions=read_config(section, "max_active_sessions", default=cls.max_active_sessions, value_type=int),
+            preload=read_config(section, "preload", default=cls.preload, value_type=bool),
+            keep_alive=read_config(section, "keep_alive", default=cls.keep_alive),
+        )
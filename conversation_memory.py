@@ -1,18 +1,41 @@
 from typing import Optional, List
 
+from conversation_store import ConversationStore
+
 class ConversationMemory:
-    def __init__(self, max_tokens: int = 2048, token_multiplier: int = 4, pre_prompt: Optional[str] = None):
+    def __init__(self,
+                 max_tokens: int = 2048,
+                 token_multiplier: int = 4,
+                 pre_prompt: Optional[str] = None,
+                 store: Optional[ConversationStore] = None,
+                 session_id: str = "default",
+                 hot_messages: int = 64):
         self.max_tokens = max_tokens
         self.token_multiplier = token_multiplier
         self.pre_prompt = pre_prompt
+        self.store = store
+        self.session_id = session_id
         self.memory: List[dict] = []
         
         if pre_prompt:
             self.memory.append({'role': 'system', 'content': pre_prompt})
+
+        # Only the most recent messages are kept in RAM; the full history stays on disk.
+        if store:
+            recent = store.load_recent(session_id, hot_messages)
+            if recent and recent[0]['role'] == 'assistant':
+                recent = recent[1:]
+            self.memory.extend(recent)
+            self._trim_memory()
     
-    def add_exchange(self, user_prompt: str, model_response: str):
-        self.memory.append({'role': 'user', 'content': user_prompt})
-        self.memory.append({'role': 'assistant', 'content': model_response})
+    def add_exchange(self, user_prompt: str, model_response: str, image: Optional[bytes] = None):
+        exchange = [
+            {'role': 'user', 'content': user_prompt},
+            {'role': 'assistant', 'content': model_response},
+        ]
+        if self.store:
+            self.store.append(self.session_id, exchange, image=image)
+        self.memory.extend(exchange)
         self._trim_memory()
     
     def _trim_memory(self):
@@ -34,6 +57,8 @@ class ConversationMemory:
     
     def clear(self):
         self.memory = []
+        if self.store:
+            self.store.clear_session(self.session_id)
         if self.pre_prompt:
             self.memory.append({'role': 'system', 'content': self.pre_prompt})
         print("Memory cleared!")
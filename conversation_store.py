@@ -0,0 +1,107 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+# Content longer than this is stored once in the blob table and referenced by hash
+INLINE_LIMIT = 256
+
+
+class ConversationStore:
+    """
+    SQLite backed history of every session's exchanges.
+
+    Messages are appended as they happen. Images and long message bodies are written to a
+    content addressed blob table, so a screenshot or a long response that repeats is only
+    stored once. Loading a session reads just its most recent messages through the
+    (session, id) index, which keeps restarts fast no matter how long the history is.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT,
+                content_hash TEXT REFERENCES blobs(hash),
+                image_hash TEXT REFERENCES blobs(hash),
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_session ON messages(session, id);
+        """)
+        self._db.commit()
+
+    def _put_blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        self._db.execute("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", (digest, data))
+        return digest
+
+    def _row(self, session: str, role: str, content: str, image: Optional[bytes], now: float):
+        content_hash = None
+        if len(content) > INLINE_LIMIT:
+            content_hash = self._put_blob(content.encode("utf-8"))
+            content = None
+        image_hash = self._put_blob(image) if image else None
+        return (session, role, content, content_hash, image_hash, now)
+
+    def append(self, session: str, messages: List[dict], image: Optional[bytes] = None):
+        """Persist messages in one transaction. The image, if any, is attached to the first."""
+        now = time.time()
+        with self._lock:
+            rows = [
+                self._row(session, m["role"], m["content"], image if i == 0 else None, now)
+                for i, m in enumerate(messages)
+            ]
+            self._db.executemany(
+                "INSERT INTO messages (session, role, content, content_hash, image_hash, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    def load_recent(self, session: str, limit: int) -> List[dict]:
+        """The last limit messages of a session, oldest first. Images are not loaded."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT m.role, COALESCE(m.content, CAST(b.data AS TEXT)) "
+                "FROM messages m LEFT JOIN blobs b ON b.hash = m.content_hash "
+                "WHERE m.session = ? ORDER BY m.id DESC LIMIT ?",
+                (session, limit),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def get_blob(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def clear_session(self, session: str):
+        with self._lock:
+            self._db.execute("DELETE FROM messages WHERE session = ?", (session,))
+            self._db.execute(
+                "DELETE FROM blobs WHERE hash NOT IN "
+                "(SELECT content_hash FROM messages WHERE content_hash IS NOT NULL "
+                "UNION SELECT image_hash FROM messages WHERE image_hash IS NOT NULL)"
+            )
+            self._db.commit()
+
+    def clear_all(self):
+        with self._lock:
+            self._db.execute("DELETE FROM messages")
+            self._db.execute("DELETE FROM blobs")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
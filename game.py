@@ -1,45 +1,94 @@
+import os
 from config import read_config
+from capture_scheduler import CaptureScheduler
 from multiprocessing import Process, Queue
 from pyboy import PyBoy
 from constants import key_map
 from game_service import MockGameService, HTTPGameService
+from lookahead import Lookahead
+from memory_utils import get_position, get_ram_snapshot
+from prompt_builder import PromptBuilder
+
+REDS_HOUSE_2F = 0x26 # The bedroom a new game starts in, once the intro is over
+SAVE_STATE = "SAVE_STATE" # Command that writes the current state to start_state
 
 class GameInstance:
-    def __init__(self, rom_path):
-        self.pyboy = PyBoy(gamerom=rom_path, sound_emulated=False)
-        self.command_queue = Queue(maxsize=100) # Agent commands. The agent may chain commands.
-        self.data_queue = Queue(maxsize=1) # Game data for the agent to act on.
+    def __init__(self, rom_path, command_queue=None, data_queue=None):
+        # Fork the lookahead workers before this process opens its own emulator window
+        self.lookahead = None
+        if read_config("Settings", "lookahead", default=False, value_type=bool):
+            self.lookahead = Lookahead(
+                rom_path,
+                frames=read_config("Settings", "lookahead_frames", default=60, value_type=int),
+                workers=read_config("Settings", "lookahead_workers", default=len(key_map), value_type=int),
+            )
+        window = read_config("Settings", "window", default="SDL2", value_type=str)
+        self.pyboy = PyBoy(gamerom=rom_path, window=window, sound_emulated=False)
+        self.start_state = read_config("Settings", "start_state", default="", value_type=str)
+        if self.start_state and os.path.exists(self.start_state):
+            # Skip the boot and intro by resuming from a cached savestate
+            with open(self.start_state, "rb") as f:
+                self.pyboy.load_state(f)
+        # Agent commands. The agent may chain commands.
+        self.command_queue = command_queue if command_queue is not None else Queue(maxsize=100)
+        # Game data for the agent to act on.
+        self.data_queue = data_queue if data_queue is not None else Queue(maxsize=1)
         self.capture_speed = read_config(
             "Settings", "capture_speed", default=1, value_type=int
         )
+        self.capture_scheduler = CaptureScheduler.from_config()
+        self._bedroom_position = None
 
     def run(self):
         game_speed = read_config("Settings", "game_speed", default=1, value_type=int)
         self.pyboy.set_emulation_speed(target_speed=game_speed)
 
-        ticks = 0
-        ticks_to_data = 300 # Set to get an initial image
+        self.capture_scheduler.start() # Get an initial image once the game settles
         while self.pyboy.tick():
             if not self.command_queue.empty():
                 command = self.read_command()
                 if command == "EXIT":
                     break
+                if command == SAVE_STATE:
+                    self.save_start_state()
+                    continue
                 self.pyboy.button(command)
-                ticks_to_data = 300
-                
-            if ticks_to_data:
-                ticks += 1
+                self.capture_scheduler.start()
 
-                if ticks >= ticks_to_data:
-                    self.capture_game_state()
-                    ticks_to_data = 0
-                    ticks = 0
+            if self.capture_scheduler.tick(self.pyboy):
+                self.capture_game_state()
+                self.detect_end_of_intro()
 
+        if self.lookahead:
+            self.lookahead.close()
         self.pyboy.stop()
 
+    def save_start_state(self):
+        if not self.start_state:
+            return
+        with open(self.start_state, "wb") as f:
+            self.pyboy.save_state(f)
+        print(f"Saved start state to {self.start_state}")
+
+    def detect_end_of_intro(self):
+        """
+        Cache the start state the first time the player walks around the bedroom on the
+        overworld screen. Moving there proves the intro is over and the player has control.
+        """
+        if not self.start_state or os.path.exists(self.start_state):
+            return
+
+        map_n, x, y = get_position(self.pyboy)
+        if map_n != REDS_HOUSE_2F or self.capture_scheduler.screen != "overworld":
+            self._bedroom_position = None
+        elif self._bedroom_position is None:
+            self._bedroom_position = (x, y)
+        elif self._bedroom_position != (x, y):
+            self.save_start_state()
+
     def read_command(self):
         command = self.command_queue.get()
-        if command == "EXIT":
+        if command in ("EXIT", SAVE_STATE):
             return command
 
         if command in key_map:
@@ -54,21 +103,42 @@ class GameInstance:
         """
         if self.data_queue.empty():
             self.image = self.pyboy.screen.image.copy()
+            outcomes = self.lookahead.run(self.pyboy) if self.lookahead else None
             self.data_queue.put(
-                (self.image, self.pyboy.game_wrapper.game_area_collision())
+                (
+                    self.image,
+                    self.pyboy.game_wrapper.game_area_collision(),
+                    outcomes,
+                    get_ram_snapshot(self.pyboy),
+                )
             )
 
     def get_output(self):
         return self.image, self.pyboy.game_wrapper.game_area_collision()
 
-def get_game_service(game: GameInstance):
+def run_game_instance(rom_path, command_queue, data_queue):
+    """Process target that builds the emulator inside the child process and runs it."""
+    GameInstance(rom_path, command_queue, data_queue).run()
+
+def make_game_service(command_queue, data_queue, session_id=None):
     mock_service = read_config("Settings", "mock_service", default=True, value_type=bool)
+    prune = read_config("Settings", "lookahead_prune", default=False, value_type=bool)
+    state_token_budget = read_config("Settings", "state_token_budget", default=96, value_type=int)
     return (
-        MockGameService(game.command_queue, game.data_queue)
+        MockGameService(command_queue, data_queue, prune_keys=prune, session_id=session_id)
         if mock_service
-        else HTTPGameService(game.command_queue, game.data_queue)
+        else HTTPGameService(
+            command_queue,
+            data_queue,
+            prune_keys=prune,
+            prompt_builder=PromptBuilder(token_budget=state_token_budget),
+            session_id=session_id,
+        )
     )
 
+def get_game_service(game: GameInstance):
+    return make_game_service(game.command_queue, game.data_queue)
+
 if __name__ == "__main__":
     gamefile = read_config("Settings", "gamefile", default="emulation/game.gb")
     mock_service = read_config("Settings", "mock", default=True, value_type=bool)
@@ -1,3 +1,4 @@
+import asyncio
 import time
 import requests
 import base64
@@ -7,18 +8,27 @@ import random
 
 from queue import Queue
 from constants import key_map
+from lookahead import productive_keys, summarize_outcomes
+from prompt_builder import PromptBuilder
 from abc import ABC, abstractmethod
 from PIL import Image
 from io import BytesIO
-from typing import Tuple
+from typing import Optional, List, Tuple
 
 
 class GameService(ABC):
-    def __init__(self, command_queue: Queue, output_queue: Queue):
+    def __init__(self, command_queue: Queue, output_queue: Queue, prune_keys: bool = False, session_id: Optional[str] = None):
         self.command_queue = command_queue
         self.data_queue = output_queue
+        self.prune_keys = prune_keys # Drop buttons the lookahead predicts do nothing
+        self.session_id = session_id # Keeps a separate conversation per game on the agent
         self._time_last_command = 0
 
+    def log(self, message: str):
+        # Many sessions share one terminal in the async runtime, so say whose output it is
+        prefix = f"[{self.session_id}] " if self.session_id is not None else ""
+        print(prefix + message, flush=True)
+
     def start_game(self):
         while True:
             self.run_agent()
@@ -31,11 +41,24 @@ class GameService(ABC):
     def run_agent(self):
         raise NotImplementedError("Method not implemented")
 
+    def prepare_decision(self, frame: tuple):
+        """
+        Turn a captured frame into the input for decide_async. Called once per frame, so
+        retries of a failed decision reuse the same input.
+        """
+        return frame
+
+    @abstractmethod
+    async def decide_async(self, prepared, client) -> Optional[str]:
+        """Pick the next key without blocking the event loop. None means try again."""
+        raise NotImplementedError("Method not implemented")
+
 
 class HTTPGameService(GameService):
-    def __init__(self, command_queue: Queue, output_queue: Queue, url: str = "http://localhost:8000/chat"):
+    def __init__(self, command_queue: Queue, output_queue: Queue, url: str = "http://localhost:8000/chat", prune_keys: bool = False, prompt_builder: Optional[PromptBuilder] = None, session_id: Optional[str] = None):
         self.url = url
-        super().__init__(command_queue, output_queue)
+        self.prompt_builder = prompt_builder or PromptBuilder()
+        super().__init__(command_queue, output_queue, prune_keys, session_id)
 
     def _encode_pil_image(self, pil_image: Image):
         """Encode PIL Image to base64 string"""
@@ -43,17 +66,35 @@ class HTTPGameService(GameService):
         pil_image.save(buffered, format="PNG")
         return base64.b64encode(buffered.getvalue()).decode('utf-8')
 
-    def stream_chat_request(
-            self,
-            prompt: str, 
-            image: Image = None,
-    ) -> str:
-        # Prepare request payload
+    def _build_payload(self, prompt: str, image: Image = None) -> dict:
         payload = {"prompt": prompt}
+        if self.session_id is not None:
+            payload['session_id'] = self.session_id
         
         # Handle optional image
         if image is not None:
             payload['image'] = self._encode_pil_image(image)
+        return payload
+
+    def _parse_line(self, line: str, echo: bool = True) -> str:
+        try:
+            json_response = json.loads(line)
+        except json.JSONDecodeError:
+            self.log(f"Error decoding line: {line}")
+            return ""
+
+        # Extract and print response
+        chunk = json_response.get('response', '')
+        if echo:
+            print(chunk, end='', flush=True)
+        return chunk
+
+    def stream_chat_request(
+            self,
+            prompt: str, 
+            image: Image = None,
+    ) -> str:
+        payload = self._build_payload(prompt, image)
         
         # Send request
         response = requests.post(self.url, json=payload, stream=True)
@@ -63,21 +104,28 @@ class HTTPGameService(GameService):
         full_response = ""
         for line in response.iter_lines():
             if line:
-                try:
-                    # Decode and parse JSON
-                    decoded_line = line.decode('utf-8')
-                    json_response = json.loads(decoded_line)
-                    
-                    # Extract and print response
-                    chunk = json_response.get('response', '')
-                    print(chunk, end='', flush=True)
-                    full_response += chunk
-                except json.JSONDecodeError:
-                    print(f"Error decoding line: {line}")
+                full_response += self._parse_line(line.decode('utf-8'))
         
         print()  # New line after response
         return full_response
 
+    async def stream_chat_request_async(self, client, prompt: str, image: Image = None) -> str:
+        """
+        Same as stream_chat_request, over a shared httpx.AsyncClient. Other sessions stream
+        at the same time, so the response is printed once it is complete instead of per chunk.
+        """
+        payload = self._build_payload(prompt, image)
+
+        full_response = ""
+        async with client.stream("POST", self.url, json=payload, timeout=None) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    full_response += self._parse_line(line, echo=False)
+
+        self.log(full_response)
+        return full_response
+
     def parse_command(self, model_output: str) -> Tuple:
         # Regex pattern to match function name and argument
         pattern = r'(\w+)\(["\']([^"\']+)["\']\)'
@@ -88,10 +136,16 @@ class HTTPGameService(GameService):
 
         return (matches[-1].group(1), matches[-1].group(2))
 
+    def build_prompt(self, outcomes: Optional[List[dict]], ram: bytes) -> str:
+        prompt = self.prompt_builder.build(ram) + "\n"
+        prompt += "This is an image of your current screen. Compare and contrast it to your current screen and previous command, if any. Has your command had any effect on the game state? After you have compared and contrasted your current screen to your previous command, give a short description of what you see and what your current goal is. Then, decide what you want to do next."
+        if outcomes:
+            prompt += "\n" + summarize_outcomes(outcomes, prune=self.prune_keys)
+        return prompt
+
     def run_agent(self):
-        image, collision = self.data_queue.get()
-        prompt = "This is an image of your current screen. Compare and contrast it to your current screen and previous command, if any. Has your command had any effect on the game state? After you have compared and contrasted your current screen to your previous command, give a short description of what you see and what your current goal is. Then, decide what you want to do next."
-        response = self.stream_chat_request(prompt, image)
+        image, collision, outcomes, ram = self.data_queue.get()
+        response = self.stream_chat_request(self.build_prompt(outcomes, ram), image)
         try:
             command = self.parse_command(response)[1]
             self.command_queue.put(command)
@@ -100,14 +154,45 @@ class HTTPGameService(GameService):
             print("INVALID INPUT", command)
         self._time_last_command = time.time()
 
+    def prepare_decision(self, frame: tuple) -> Tuple:
+        # Building the prompt advances the prompt builder's dedup state, so do it only once
+        image, collision, outcomes, ram = frame
+        return self.build_prompt(outcomes, ram), image
+
+    async def decide_async(self, prepared: Tuple, client) -> Optional[str]:
+        prompt, image = prepared
+        response = await self.stream_chat_request_async(client, prompt, image)
+        self._time_last_command = time.time()
+        try:
+            command = self.parse_command(response)[1]
+        except ValueError:
+            command = None
+        if command not in key_map:
+            # TODO: we should inform the LLM when it does an oopsie
+            self.log(f"INVALID INPUT {command}")
+            return None
+        return command
+
 
 class MockGameService(GameService):
-    def parse_command(self, output):
-        return random.choice(list(key_map))
+    think_time = 1 # Simulate the agent needing some thinking time
+
+    def parse_command(self, output: Optional[List[dict]]):
+        keys = list(key_map)
+        if output and self.prune_keys:
+            keys = list(productive_keys(output)) or keys
+        return random.choice(keys)
 
     def run_agent(self):
-        image, collision = self.data_queue.get()
-        time.sleep(1) # Simulate the agent needing some thinking time
-        key = self.parse_command(None)
+        image, collision, outcomes, ram = self.data_queue.get()
+        time.sleep(self.think_time)
+        key = self.parse_command(outcomes)
         print(f"Key: {key}")
         self.command_queue.put(key)
+
+    async def decide_async(self, prepared: tuple, client) -> Optional[str]:
+        image, collision, outcomes, ram = prepared
+        await asyncio.sleep(self.think_time)
+        key = self.parse_command(outcomes)
+        self.log(f"Key: {key}")
+        return key
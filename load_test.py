@@ -0,0 +1,282 @@
+"""
+Load test for the agent service's /chat endpoint.
+
+Starts a local agent_service backed by a stub model (or targets --url), replays recorded
+or synthetic chat requests at increasing rates and reports time-to-first-chunk, full
+response latency, error rate, event loop lag and server memory for each rate.
+
+    python load_test.py --rates 1,2,4,8 --duration 20 --image-ratio 0.5
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import time
+from io import BytesIO
+from typing import List, Optional
+
+import httpx
+
+
+class StubBackendPool:
+    """Stands in for BackendPool with fixed delays, so the service can be tested without a model."""
+
+    def __init__(self, first_chunk_delay: float = 0.2, chunk_delay: float = 0.02, chunks: int = 20):
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.chunks = chunks
+
+    def chat(self, session_id=None, **kwargs) -> dict:
+        time.sleep(self.first_chunk_delay)
+        return {'message': {'content': 'A small sprite standing in a room.'}}
+
+    def chat_stream(self, session_id=None, **kwargs):
+        time.sleep(self.first_chunk_delay)
+        for i in range(self.chunks):
+            yield {'message': {'content': f'token{i} '}}
+            time.sleep(self.chunk_delay)
+        yield {'message': {'content': 'input_key("a")'}}
+
+    def preload(self, model: str, keep_alive: Optional[str] = None) -> bool:
+        return True
+
+    def start_health_checks(self):
+        pass
+
+    def __str__(self) -> str:
+        return "StubBackendPool"
+
+
+def serve_stub(args):
+    from agent import LLMAgent
+    from agent_service import WebService
+
+    backend_pool = StubBackendPool(args.stub_first_chunk, args.stub_chunk_delay, args.stub_chunks)
+    llm_agent = LLMAgent(
+        model="stub",
+        context_size=2048,
+        image_model="stub-vision" if args.stub_image_model else None,
+        backend_pool=backend_pool,
+    )
+    WebService(llm_agent, preload=False).run(host="127.0.0.1", port=args.port)
+
+
+def synthetic_image() -> str:
+    from PIL import Image
+
+    # Same size as a Game Boy screen capture
+    buffered = BytesIO()
+    Image.effect_noise((160, 144), 64).convert("RGB").save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+
+def load_payloads(args) -> List[dict]:
+    if args.requests:
+        with open(args.requests) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    image = synthetic_image() if args.image_ratio > 0 else None
+    payloads = []
+    for i in range(100):
+        payload = {"prompt": f"Game state:\nMap 0 at x={i % 10} y={i // 10}\nWhat do you do next?"}
+        if image and (i % 100) < args.image_ratio * 100:
+            payload["image"] = image
+        payloads.append(payload)
+    return payloads
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def send_chat(client: httpx.AsyncClient, url: str, payload: dict, scheduled: float) -> dict:
+    # Latencies are measured from when the request was due, not when it got a connection,
+    # so queueing behind the concurrency cap shows up in the numbers.
+    result = {"ttfc": None, "latency": None, "error": None}
+    try:
+        async with client.stream("POST", url, json=payload, timeout=120) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line and result["ttfc"] is None:
+                    result["ttfc"] = time.perf_counter() - scheduled
+        result["latency"] = time.perf_counter() - scheduled
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    return result
+
+
+async def probe_loop(client: httpx.AsyncClient, url: str, lags: List[float], stop: asyncio.Event):
+    """Time a trivial endpoint while under load; slow answers mean the event loop is blocked."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get(url, timeout=10)
+            lags.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+
+
+async def sample_rss(pid: Optional[int], samples: List[tuple], stop: asyncio.Event, started: float):
+    while pid and not stop.is_set():
+        samples.append((round(time.perf_counter() - started, 2), read_rss_kb(pid)))
+        await asyncio.sleep(0.5)
+
+
+async def run_step(args, payloads: List[dict], rate: float, server_pid: Optional[int]) -> dict:
+    chat_url = args.url.rstrip("/") + "/chat"
+    ready_url = args.url.rstrip("/") + "/ready"
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results, lags, rss = [], [], []
+    stop = asyncio.Event()
+
+    async def fire(i: int, scheduled: float):
+        payload = dict(payloads[i % len(payloads)])
+        payload.setdefault("session_id", f"load-{i % args.sessions}")
+        async with semaphore:
+            results.append(await send_chat(client, chat_url, payload, scheduled))
+
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(limits=limits) as client:
+        started = time.perf_counter()
+        background = [
+            asyncio.create_task(probe_loop(client, ready_url, lags, stop)),
+            asyncio.create_task(sample_rss(server_pid, rss, stop, started)),
+        ]
+
+        # Open loop: requests go out on schedule whether or not earlier ones have finished
+        tasks = []
+        total = int(rate * args.duration)
+        for i in range(total):
+            scheduled = started + i / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            tasks.append(asyncio.create_task(fire(i, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await asyncio.gather(*background)
+
+    ok = [r for r in results if r["error"] is None]
+    ttfc = [r["ttfc"] for r in ok if r["ttfc"] is not None]
+    latency = [r["latency"] for r in ok]
+    return {
+        "rate": rate,
+        "requests": len(results),
+        "throughput": len(ok) / elapsed,
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "errors": sorted({r["error"] for r in results if r["error"]}),
+        "ttfc": {p: percentile(ttfc, p) for p in (50, 95, 99)},
+        "latency": {p: percentile(latency, p) for p in (50, 95, 99)},
+        "loop_lag_p95": percentile(lags, 95),
+        "rss_kb": rss,
+    }
+
+
+def fmt(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+def format_report(steps: List[dict]) -> str:
+    lines = [
+        "| rate/s | done/s | err % | ttfc p50/p95/p99 ms | latency p50/p95/p99 ms | loop lag p95 ms | RSS start->end MB |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for step in steps:
+        rss = [kb for _, kb in step["rss_kb"] if kb]
+        rss_text = f"{rss[0] / 1024:.1f}->{rss[-1] / 1024:.1f}" if rss else "-"
+        lines.append(
+            f"| {step['rate']:g} | {step['throughput']:.2f} | {step['error_rate'] * 100:.1f} "
+            f"| {'/'.join(fmt(step['ttfc'][p]) for p in (50, 95, 99))} "
+            f"| {'/'.join(fmt(step['latency'][p]) for p in (50, 95, 99))} "
+            f"| {fmt(step['loop_lag_p95'])} | {rss_text} |"
+        )
+    return "\n".join(lines)
+
+
+def wait_until_ready(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url.rstrip("/") + "/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Service at {url} did not become ready")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Existing service to test. Default starts a stub server.")
+    parser.add_argument("--server-pid", type=int, default=None, help="PID of --url's server, for RSS tracking")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rates", default="1,2,4,8", help="Comma separated request rates per second")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per rate")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max requests in flight")
+    parser.add_argument("--sessions", type=int, default=8, help="Distinct session_ids to spread requests over")
+    parser.add_argument("--requests", default=None, help="JSONL of recorded ChatRequest bodies to replay")
+    parser.add_argument("--image-ratio", type=float, default=0.5, help="Share of synthetic requests with an image")
+    parser.add_argument("--output", default="load_report.json", help="Where to write the raw results")
+    parser.add_argument("--stub-first-chunk", type=float, default=0.2)
+    parser.add_argument("--stub-chunk-delay", type=float, default=0.02)
+    parser.add_argument("--stub-chunks", type=int, default=20)
+    parser.add_argument("--stub-image-model", action="store_true", help="Stub a separate image model call")
+    parser.add_argument("--serve-stub", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.serve_stub:
+        serve_stub(args)
+        return
+
+    server = None
+    server_pid = args.server_pid
+    if args.url is None:
+        args.url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve-stub"] + sys.argv[1:],
+            stdin=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        server_pid = server.pid
+
+    try:
+        wait_until_ready(args.url)
+        payloads = load_payloads(args)
+        steps = []
+        for rate in (float(r) for r in args.rates.split(",")):
+            print(f"Running {rate:g} req/s for {args.duration:g}s...", flush=True)
+            steps.append(asyncio.run(run_step(args, payloads, rate, server_pid)))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    print(format_report(steps))
+    with open(args.output, "w") as f:
+        json.dump(steps, f, indent=2)
+    print(f"Raw results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
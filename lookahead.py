@@ -0,0 +1,113 @@
+from io import BytesIO
+from multiprocessing import Pool
+from typing import Dict, List, Optional
+
+from pyboy import PyBoy
+
+from constants import key_map
+from memory_utils import get_battle_type, get_event_flags, get_position, get_text_box
+
+# Headless emulator owned by each pool worker, created once by _init_worker.
+_worker_pyboy: Optional[PyBoy] = None
+
+
+def _init_worker(rom_path: str):
+    global _worker_pyboy
+    _worker_pyboy = PyBoy(gamerom=rom_path, window="null", sound_emulated=False)
+    _worker_pyboy.set_emulation_speed(target_speed=0)
+
+
+def snapshot(pyboy: PyBoy) -> dict:
+    return {
+        "position": get_position(pyboy),
+        "battle": get_battle_type(pyboy),
+        "text": get_text_box(pyboy),
+        "event_flags": get_event_flags(pyboy),
+    }
+
+
+def compare(before: dict, after: dict) -> dict:
+    flags_set = sum(
+        bin(~b & a).count("1") for b, a in zip(before["event_flags"], after["event_flags"])
+    )
+    outcome = {
+        "moved": before["position"][1:] != after["position"][1:],
+        "map_changed": before["position"][0] != after["position"][0],
+        "position": after["position"],
+        "battle_started": not before["battle"] and bool(after["battle"]),
+        "new_text": after["text"] if after["text"] != before["text"] else "",
+        "event_flags_set": flags_set,
+    }
+    outcome["productive"] = any((
+        outcome["moved"],
+        outcome["map_changed"],
+        outcome["battle_started"],
+        outcome["new_text"],
+        flags_set,
+        before["text"] != after["text"],
+    ))
+    return outcome
+
+
+def _simulate(args) -> dict:
+    state, key, frames = args
+    _worker_pyboy.load_state(BytesIO(state))
+    before = snapshot(_worker_pyboy)
+    _worker_pyboy.button(key)
+    _worker_pyboy.tick(frames, False)
+    outcome = compare(before, snapshot(_worker_pyboy))
+    outcome["key"] = key
+    return outcome
+
+
+class Lookahead:
+    """
+    Previews what each button would do by replaying the current savestate in a pool of
+    headless emulators, one key per worker, fast-forwarded for a fixed number of frames.
+    """
+
+    def __init__(self, rom_path: str, frames: int = 60, workers: int = len(key_map)):
+        self.frames = frames
+        self.pool = Pool(processes=workers, initializer=_init_worker, initargs=(rom_path,))
+
+    def run(self, pyboy: PyBoy) -> List[dict]:
+        state = BytesIO()
+        pyboy.save_state(state)
+        state = state.getvalue()
+        return self.pool.map(_simulate, [(state, key, self.frames) for key in key_map])
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def describe_outcome(outcome: dict) -> str:
+    effects = []
+    if outcome["map_changed"]:
+        effects.append(f"enters map {outcome['position'][0]}")
+    elif outcome["moved"]:
+        effects.append(f"moves to {outcome['position'][1:]}")
+    if outcome["battle_started"]:
+        effects.append("starts a battle")
+    if outcome["new_text"]:
+        effects.append(f"shows text \"{outcome['new_text']}\"")
+    if outcome["event_flags_set"]:
+        effects.append(f"sets {outcome['event_flags_set']} event flag(s)")
+    if not effects:
+        effects.append("changes the screen" if outcome["productive"] else "no effect")
+    return f"{outcome['key']}: " + ", ".join(effects)
+
+
+def summarize_outcomes(outcomes: List[dict], prune: bool = False) -> str:
+    """Prompt text for the lookahead. With prune, keys that did nothing are left out."""
+    shown = [o for o in outcomes if o["productive"]] if prune else outcomes
+    if not shown:
+        return ""
+    summary = "Predicted effect of each button:\n" + "\n".join(describe_outcome(o) for o in shown)
+    if prune and len(shown) < len(outcomes):
+        summary += "\nButtons not listed have no effect right now."
+    return summary
+
+
+def productive_keys(outcomes: List[dict]) -> Dict[str, dict]:
+    return {o["key"]: o for o in outcomes if o["productive"]}
@@ -1,10 +1,64 @@
 from pyboy import PyBoy
 
+from address_constants import (
+    BADGE_COUNT_ADDRESS,
+    BATTLE_TYPE_ADDRESS,
+    EVENT_FLAGS_END_ADDRESS,
+    EVENT_FLAGS_START_ADDRESS,
+    HP_ADDRESSES,
+    LEVELS_ADDRESSES,
+    MAP_N_ADDRESS,
+    MAX_HP_ADDRESSES,
+    MONEY_ADDRESS_1,
+    MONEY_ADDRESS_2,
+    MONEY_ADDRESS_3,
+    PARTY_ADDRESSES,
+    PARTY_SIZE_ADDRESS,
+    SCREEN_WIDTH_TILES,
+    TEXT_BOX_CORNER_TILE,
+    TEXT_BOX_TOP_ROW,
+    TILE_MAP_ADDRESS,
+    WRAM_END_ADDRESS,
+    WRAM_START_ADDRESS,
+    X_POS_ADDRESS,
+    Y_POS_ADDRESS,
+)
+from pokemon_constants import internal_index_to_dex, pokemon_constants
+
+
+class RamSnapshot:
+    """
+    Work RAM copied out of the emulator in one go. It has the same memory[addr] interface
+    as PyBoy, so every decoder in this module works on a live emulator or a snapshot.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.memory = self
+
+    def __getitem__(self, addr):
+        if isinstance(addr, slice):
+            return self.data[addr.start - WRAM_START_ADDRESS:addr.stop - WRAM_START_ADDRESS]
+        return self.data[addr - WRAM_START_ADDRESS]
+
 
 def read_m(pyboy: PyBoy, addr) -> int:
     return pyboy.memory[addr]
 
 
+def read_u16(pyboy: PyBoy, addr) -> int:
+    # Multi-byte stats are stored big-endian
+    return (read_m(pyboy, addr) << 8) | read_m(pyboy, addr + 1)
+
+
+def read_bcd(pyboy: PyBoy, *addrs) -> int:
+    value = 0
+    for addr in addrs:
+        b = read_m(pyboy, addr)
+        value = value * 100 + (b >> 4) * 10 + (b & 0x0F)
+    return value
+
+
 def map_char(b) -> chr:
     if b == 0x50:  # Terminator byte
         return None
@@ -52,21 +106,17 @@ def get_first_pokemon_info(pyboy):
     if party_count == 0:
         return {"species": 0, "level": 0, "nickname": "", "current_hp": 0, "max_hp": 0}
 
-    # Species (1 byte at D16B)
+    # Species (1 byte at D16B, internal index)
     species = read_m(pyboy, 0xD16B)
 
     # Level (1 byte at D18C)
-    level = read_m(pyboy, 0xD18C)
+    level = read_m(pyboy, LEVELS_ADDRESSES[0])
 
-    # Current HP (little-endian, 2 bytes at D16C-D16D)
-    current_hp_low = read_m(pyboy, 0xD16C)
-    current_hp_high = read_m(pyboy, 0xD16D)
-    current_hp = (current_hp_high << 8) | current_hp_low
+    # Current HP (big-endian, 2 bytes at D16C-D16D)
+    current_hp = read_u16(pyboy, HP_ADDRESSES[0])
 
-    # Max HP (little-endian, 2 bytes at D186-D187)
-    max_hp_low = read_m(pyboy, 0xD186)
-    max_hp_high = read_m(pyboy, 0xD187)
-    max_hp = (max_hp_high << 8) | max_hp_low
+    # Max HP (big-endian, 2 bytes at D18D-D18E)
+    max_hp = read_u16(pyboy, MAX_HP_ADDRESSES[0])
 
     # Nickname (11 bytes starting at D2B5)
     nickname_address = 0xD2B5
@@ -87,3 +137,76 @@ def get_first_pokemon_info(pyboy):
         "current_hp": current_hp,
         "max_hp": max_hp,
     }
+
+
+def get_position(pyboy):
+    return (
+        read_m(pyboy, MAP_N_ADDRESS),
+        read_m(pyboy, X_POS_ADDRESS),
+        read_m(pyboy, Y_POS_ADDRESS),
+    )
+
+
+def get_battle_type(pyboy) -> int:
+    return read_m(pyboy, BATTLE_TYPE_ADDRESS)
+
+
+def get_event_flags(pyboy) -> bytes:
+    return bytes(
+        read_m(pyboy, addr)
+        for addr in range(EVENT_FLAGS_START_ADDRESS, EVENT_FLAGS_END_ADDRESS)
+    )
+
+
+def has_text_box(pyboy) -> bool:
+    corner = TILE_MAP_ADDRESS + TEXT_BOX_TOP_ROW * SCREEN_WIDTH_TILES
+    return read_m(pyboy, corner) == TEXT_BOX_CORNER_TILE
+
+
+def get_text_box(pyboy) -> str:
+    """
+    Text in the dialogue box, read from the two text lines of the on-screen tile buffer.
+    Tile ids of font characters match the game's character encoding, so map_char applies.
+    Empty when no dialogue box is open, since those rows then hold map tiles.
+    """
+    if not has_text_box(pyboy):
+        return ""
+
+    lines = []
+    for row in (14, 16):
+        start = TILE_MAP_ADDRESS + row * SCREEN_WIDTH_TILES
+        chars = [map_char(read_m(pyboy, start + col)) for col in range(1, SCREEN_WIDTH_TILES - 1)]
+        lines.append("".join(c for c in chars if c is not None).strip())
+    return " ".join(line for line in lines if line)
+
+
+def get_ram_snapshot(pyboy) -> bytes:
+    """Copy of work RAM, so a consistent game state can be decoded in another process."""
+    return bytes(pyboy.memory[WRAM_START_ADDRESS:WRAM_END_ADDRESS])
+
+
+def get_species_name(index: int) -> str:
+    """Name for a species stored in RAM, which uses the game's internal index."""
+    dex = internal_index_to_dex.get(index)
+    return pokemon_constants[dex] if dex else f"MISSINGNO({index})"
+
+
+def get_party(pyboy) -> list:
+    party_size = min(read_m(pyboy, PARTY_SIZE_ADDRESS), len(PARTY_ADDRESSES))
+    return [
+        {
+            "species": get_species_name(read_m(pyboy, PARTY_ADDRESSES[i])),
+            "level": read_m(pyboy, LEVELS_ADDRESSES[i]),
+            "current_hp": read_u16(pyboy, HP_ADDRESSES[i]),
+            "max_hp": read_u16(pyboy, MAX_HP_ADDRESSES[i]),
+        }
+        for i in range(party_size)
+    ]
+
+
+def get_money(pyboy) -> int:
+    return read_bcd(pyboy, MONEY_ADDRESS_1, MONEY_ADDRESS_2, MONEY_ADDRESS_3)
+
+
+def get_badge_count(pyboy) -> int:
+    return bin(read_m(pyboy, BADGE_COUNT_ADDRESS)).count("1")
@@ -0,0 +1,104 @@
+from typing import Dict, List, Optional, Tuple
+
+from memory_utils import (
+    RamSnapshot,
+    get_badge_count,
+    get_event_flags,
+    get_money,
+    get_party,
+    get_position,
+)
+
+MAX_LISTED_FLAGS = 8
+
+
+def decode_game_state(ram: RamSnapshot) -> dict:
+    map_n, x, y = get_position(ram)
+    return {
+        "map": map_n,
+        "position": (x, y),
+        "party": get_party(ram),
+        "money": get_money(ram),
+        "badges": get_badge_count(ram),
+        "event_flags": get_event_flags(ram),
+    }
+
+
+def newly_set_flags(before: bytes, after: bytes) -> List[int]:
+    flags = []
+    for i, (b, a) in enumerate(zip(before, after)):
+        new = ~b & a
+        flags.extend(i * 8 + bit for bit in range(8) if new >> bit & 1)
+    return flags
+
+
+class PromptBuilder:
+    """
+    Renders a compact game state block for the agent prompt.
+
+    Each turn only the lines that changed since the last turn are sent, with a full
+    refresh every full_every turns so the state is not lost when conversation memory is
+    trimmed. Lines are added in priority order until the token budget is used up; a line
+    that does not fit is not marked as sent, so it goes out on a later turn. For event
+    flags that means newly set flags are counted from the last snapshot whose flags
+    line was actually sent.
+    """
+
+    def __init__(self, token_budget: int = 96, token_multiplier: int = 4, full_every: int = 10):
+        self.token_budget = token_budget
+        self.token_multiplier = token_multiplier
+        self.full_every = full_every
+        self._sent: Dict[str, str] = {}
+        self._last_flags: Optional[bytes] = None
+        self._turn = 0
+
+    def _render_lines(self, state: dict) -> List[Tuple[str, str]]:
+        lines = [("position", f"Map {state['map']} at x={state['position'][0]} y={state['position'][1]}")]
+
+        party = ", ".join(
+            f"{p['species']} L{p['level']} {p['current_hp']}/{p['max_hp']}HP" for p in state["party"]
+        )
+        lines.append(("party", f"Party: {party or 'none'}"))
+        lines.append(("money", f"Money: {state['money']}, badges: {state['badges']}"))
+
+        if self._last_flags is None:
+            total = sum(bin(b).count("1") for b in state["event_flags"])
+            lines.append(("flags", f"Event flags set: {total}"))
+        else:
+            new_flags = newly_set_flags(self._last_flags, state["event_flags"])
+            if new_flags:
+                listed = ", ".join(str(f) for f in new_flags[:MAX_LISTED_FLAGS])
+                more = f" (+{len(new_flags) - MAX_LISTED_FLAGS} more)" if len(new_flags) > MAX_LISTED_FLAGS else ""
+                lines.append(("flags", f"New event flags: {listed}{more}"))
+        return lines
+
+    def _tokens(self, text: str) -> int:
+        return len(text) // self.token_multiplier + 1
+
+    def build(self, ram: bytes) -> str:
+        state = decode_game_state(RamSnapshot(ram))
+        full = self._turn % self.full_every == 0
+        self._turn += 1
+
+        budget = self.token_budget - self._tokens("Game state:")
+        out = []
+        lines = self._render_lines(state)
+        flags_pending = any(key == "flags" for key, _ in lines)
+        for key, text in lines:
+            if not full and key != "flags" and self._sent.get(key) == text:
+                continue
+            cost = self._tokens(text)
+            if cost > budget:
+                continue
+            budget -= cost
+            out.append(text)
+            self._sent[key] = text
+            if key == "flags":
+                flags_pending = False
+
+        if not flags_pending:
+            self._last_flags = state["event_flags"]
+
+        if not out:
+            return "Game state: unchanged."
+        return "Game state:\n" + "\n".join(out)
@@ -0,0 +1,100 @@
+import asyncio
+import queue
+
+from async_game_service import AsyncGameRuntime
+from constants import key_map
+from game_service import MockGameService
+
+FRAME = (None, None, None, b"")
+
+
+class FakeProcess:
+    """Stands in for an emulator process that exits once it has received a command."""
+
+    def __init__(self, command_queue, alive=True):
+        self.command_queue = command_queue
+        self.alive = alive
+        self.pid = 1234
+        self.exitcode = None
+
+    def is_alive(self) -> bool:
+        if self.alive and not self.command_queue.empty():
+            self.alive, self.exitcode = False, 0
+        return self.alive
+
+
+def make_session(service_class=MockGameService, frames=1, alive=True, **kwargs):
+    command_queue, data_queue = queue.Queue(maxsize=100), queue.Queue()
+    for _ in range(frames):
+        data_queue.put(FRAME)
+    service = service_class(command_queue, data_queue, **kwargs)
+    service.think_time = 0.01
+    return service, FakeProcess(command_queue, alive)
+
+
+def run(runtime, timeout=5):
+    asyncio.run(asyncio.wait_for(runtime.run(), timeout))
+
+
+def test_concurrent_decisions_are_capped():
+    in_flight, peak = 0, 0
+
+    class CountingService(MockGameService):
+        async def decide_async(self, prepared, client):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                return await super().decide_async(prepared, client)
+            finally:
+                in_flight -= 1
+
+    runtime = AsyncGameRuntime(max_concurrent_requests=2, poll_interval=0.001)
+    sessions = [make_session(CountingService, session_id=f"game-{i}") for i in range(6)]
+    for service, process in sessions:
+        runtime.add_session(service, process)
+    run(runtime)
+
+    assert peak == 2
+    assert runtime.decisions == 6
+    assert all(service.command_queue.get_nowait() in key_map for service, _ in sessions)
+
+
+def test_session_ends_when_its_process_exits():
+    runtime = AsyncGameRuntime(poll_interval=0.001)
+    exited_service, exited = make_session(frames=0, alive=False, session_id="game-0")
+    service, process = make_session(session_id="game-1")
+    runtime.add_session(exited_service, exited)
+    runtime.add_session(service, process)
+    run(runtime)
+
+    assert exited_service.command_queue.empty()
+    assert service.command_queue.get_nowait() in key_map
+    assert runtime.decisions == 1
+
+
+def test_retry_reuses_prepared_decision():
+    prepared_calls = []
+
+    class FlakyService(MockGameService):
+        failures = 2
+
+        def prepare_decision(self, frame):
+            prepared_calls.append(frame)
+            return ("prompt", len(prepared_calls))
+
+        async def decide_async(self, prepared, client):
+            assert prepared == ("prompt", 1)
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("agent unavailable")
+            return "a"
+
+    runtime = AsyncGameRuntime(poll_interval=0.001, retry_delay=0)
+    service, process = make_session(FlakyService, session_id="game-0")
+    runtime.add_session(service, process)
+    run(runtime)
+
+    assert prepared_calls == [FRAME]
+    assert runtime.failures == 2
+    assert service.command_queue.get_nowait() == "a"
@@ -0,0 +1,148 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from backend_pool import BackendPool, BackendUnavailableError
+
+
+class StubOllama:
+    """A local stand-in for an ollama server that records the requests it answers."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.chats = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: str, content_type="application/json", status=200):
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._send(json.dumps({"models": []}))
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if request.get("model") == "missing":
+                    self._send(json.dumps({"error": "model not found"}), status=404)
+                    return
+                if self.path == "/api/generate":
+                    self._send(json.dumps({"model": "m", "response": "", "done": True}))
+                    return
+                stub.chats += 1
+                message = {"role": "assistant", "content": stub.name}
+                if request.get("stream"):
+                    lines = [
+                        {"model": "m", "message": message, "done": False},
+                        {"model": "m", "message": {"role": "assistant", "content": ""}, "done": True},
+                    ]
+                    self._send("\n".join(json.dumps(line) for line in lines) + "\n", "application/x-ndjson")
+                else:
+                    self._send(json.dumps({"model": "m", "message": message, "done": True}))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def closed_port_host() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+@pytest.fixture
+def stubs():
+    servers = [StubOllama("a"), StubOllama("b")]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def chat_text(pool, session_id):
+    return "".join(
+        chunk["message"]["content"]
+        for chunk in pool.chat_stream(session_id=session_id, model="m", messages=[])
+    )
+
+
+def test_routes_to_least_outstanding(stubs):
+    pool = BackendPool([s.host for s in stubs])
+    busy = pool.acquire()
+    assert pool.acquire() is not busy
+
+
+def test_session_affinity(stubs):
+    pool = BackendPool([s.host for s in stubs])
+    first = chat_text(pool, "game-0")
+    assert all(chat_text(pool, "game-0") == first for _ in range(5))
+    assert chat_text(pool, "game-1") in ("a", "b")
+
+
+def test_affinity_yields_to_load(stubs):
+    pool = BackendPool([s.host for s in stubs], max_affinity_skew=1)
+    sticky = pool.acquire("game-0")
+    pool.release(sticky)
+    sticky.outstanding = 2
+    assert pool.acquire("game-0") is not sticky
+
+
+def test_failover_to_healthy_backend(stubs):
+    pool = BackendPool([closed_port_host(), stubs[0].host])
+    assert chat_text(pool, "game-0") == "a"
+    assert pool.chat(model="m", messages=[])["message"]["content"] == "a"
+    assert not pool.backends[0].healthy
+    assert all(b.outstanding == 0 for b in pool.backends)
+
+
+def test_health_check_recovers(stubs):
+    pool = BackendPool([stubs[0].host])
+    pool.mark_failed(pool.backends[0])
+    assert pool.backends[0].check_health()
+
+
+def test_preload(stubs):
+    pool = BackendPool([closed_port_host(), stubs[0].host])
+    assert pool.preload("m")
+    assert [b.healthy for b in pool.backends] == [False, True]
+
+
+def test_preload_of_missing_model_keeps_host_up(stubs):
+    pool = BackendPool([stubs[0].host])
+    assert not pool.preload("missing")
+    assert pool.backends[0].healthy
+
+
+def test_affinity_is_bounded(stubs):
+    pool = BackendPool([s.host for s in stubs], max_sessions=2)
+    for i in range(5):
+        pool.release(pool.acquire(f"game-{i}"))
+    assert list(pool._affinity) == ["game-3", "game-4"]
+
+
+def test_all_backends_down_keeps_the_cause():
+    pool = BackendPool([closed_port_host(), closed_port_host()])
+    with pytest.raises(BackendUnavailableError) as error:
+        pool.chat(model="m", messages=[])
+    assert isinstance(error.value.__cause__, ConnectionError)
+    with pytest.raises(BackendUnavailableError) as error:
+        list(pool.chat_stream(model="m", messages=[]))
+    # The streaming client surfaces httpx's own error instead of ConnectionError
+    assert isinstance(error.value.__cause__, httpx.ConnectError)
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from address_constants import WALK_COUNTER_ADDRESS, X_POS_ADDRESS
+from capture_scheduler import CaptureScheduler
+
+BOUNDS = {
+    "overworld": (8, 40),
+    "text": (4, 40),
+    "battle": (8, 40),
+}
+
+
+class FakePyBoy:
+    def __init__(self):
+        self.memory = bytearray(0x10000)
+        self.screen = SimpleNamespace(ndarray=np.zeros((144, 160, 4), dtype=np.uint8))
+
+
+def ticks_until_capture(scheduler, pyboy, step=lambda tick: None, limit=1000):
+    scheduler.start()
+    for tick in range(1, limit + 1):
+        step(tick)
+        if scheduler.tick(pyboy):
+            return tick
+    raise AssertionError("Scheduler never captured")
+
+
+def test_static_screen_waits_for_min_bound():
+    scheduler = CaptureScheduler(stable_ticks=2, bounds=BOUNDS)
+    assert ticks_until_capture(scheduler, FakePyBoy()) == 8
+    assert scheduler.screen == "overworld"
+
+
+def test_no_capture_while_walking():
+    pyboy = FakePyBoy()
+    pyboy.memory[WALK_COUNTER_ADDRESS] = 8
+
+    def step(tick):
+        # The rest of the signature is already still; only the walk counter runs down
+        if tick % 2 == 0 and pyboy.memory[WALK_COUNTER_ADDRESS]:
+            pyboy.memory[WALK_COUNTER_ADDRESS] -= 1
+
+    scheduler = CaptureScheduler(stable_ticks=2, bounds=BOUNDS)
+    captured = ticks_until_capture(scheduler, pyboy, step)
+    # Counter reaches 0 on tick 16, then needs stable_ticks unchanged frames
+    assert captured == 18
+
+
+def test_never_settling_screen_capped_by_max_bound():
+    pyboy = FakePyBoy()
+
+    def step(tick):
+        pyboy.screen.ndarray[0, 0, 0] = tick % 256
+
+    scheduler = CaptureScheduler(stable_ticks=2, bounds=BOUNDS)
+    assert ticks_until_capture(scheduler, pyboy, step) == 40
+
+
+def test_position_change_restarts_stable_count():
+    pyboy = FakePyBoy()
+
+    def step(tick):
+        if tick == 6:
+            pyboy.memory[X_POS_ADDRESS] = 1
+
+    scheduler = CaptureScheduler(stable_ticks=4, bounds=BOUNDS)
+    assert ticks_until_capture(scheduler, pyboy, step) == 10
@@ -0,0 +1,76 @@
+from conversation_memory import ConversationMemory
+from conversation_store import INLINE_LIMIT, ConversationStore
+
+
+def count(store, table):
+    return store._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_history_reloads_after_restart(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    store = ConversationStore(path)
+    memory = ConversationMemory(pre_prompt="Play the game.", store=store, session_id="game-0")
+    memory.add_exchange("Where am I?", "In your room.")
+    ConversationMemory(store=store, session_id="game-1").add_exchange("Other", "Session")
+    store.close()
+
+    store = ConversationStore(path)
+    memory = ConversationMemory(pre_prompt="Play the game.", store=store, session_id="game-0")
+    assert memory.get_context() == [
+        {'role': 'system', 'content': 'Play the game.'},
+        {'role': 'user', 'content': 'Where am I?'},
+        {'role': 'assistant', 'content': 'In your room.'},
+    ]
+
+
+def test_only_hot_window_is_loaded(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.sqlite3"))
+    memory = ConversationMemory(store=store, session_id="game-0")
+    for i in range(10):
+        memory.add_exchange(f"prompt {i}", f"response {i}")
+
+    reloaded = ConversationMemory(store=store, session_id="game-0", hot_messages=4)
+    assert [m['content'] for m in reloaded.get_context()] == [
+        "prompt 8", "response 8", "prompt 9", "response 9",
+    ]
+
+
+def test_window_starting_with_assistant_drops_it(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.sqlite3"))
+    memory = ConversationMemory(store=store, session_id="game-0")
+    memory.add_exchange("prompt 0", "response 0")
+    memory.add_exchange("prompt 1", "response 1")
+
+    reloaded = ConversationMemory(store=store, session_id="game-0", hot_messages=3)
+    assert [m['role'] for m in reloaded.get_context()] == ["user", "assistant"]
+    assert reloaded.get_context()[0]['content'] == "prompt 1"
+
+
+def test_repeated_blobs_are_stored_once(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.sqlite3"))
+    long_response = "x" * (INLINE_LIMIT + 1)
+    image = b"\x89PNG screenshot"
+    for i in range(3):
+        store.append("game-0", [
+            {'role': 'user', 'content': f"prompt {i}"},
+            {'role': 'assistant', 'content': long_response},
+        ], image=image)
+
+    assert count(store, "messages") == 6
+    assert count(store, "blobs") == 2
+    assert store.load_recent("game-0", 1)[0]['content'] == long_response
+
+
+def test_clear_session_removes_orphan_blobs(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.sqlite3"))
+    shared = "shared " * INLINE_LIMIT
+    store.append("game-0", [{'role': 'user', 'content': shared}], image=b"only game-0")
+    store.append("game-1", [{'role': 'user', 'content': shared}])
+
+    store.clear_session("game-0")
+    assert store.load_recent("game-0", 10) == []
+    assert count(store, "blobs") == 1
+
+    store.clear_session("game-1")
+    assert count(store, "messages") == 0
+    assert count(store, "blobs") == 0
@@ -0,0 +1,52 @@
+from address_constants import (
+    SCREEN_HEIGHT_TILES,
+    SCREEN_WIDTH_TILES,
+    TEXT_BOX_CORNER_TILE,
+    TEXT_BOX_TOP_ROW,
+    TILE_MAP_ADDRESS,
+    WRAM_END_ADDRESS,
+    WRAM_START_ADDRESS,
+)
+from lookahead import compare, snapshot
+from memory_utils import RamSnapshot
+
+# Tile ids 0x80-0x99 are the letters A-Z, which map tiles also use
+LETTER_A = 0x80
+
+
+def make_ram(tiles):
+    ram = bytearray(WRAM_END_ADDRESS - WRAM_START_ADDRESS)
+    start = TILE_MAP_ADDRESS - WRAM_START_ADDRESS
+    ram[start:start + len(tiles)] = tiles
+    return RamSnapshot(bytes(ram))
+
+
+def overworld_tiles(offset):
+    return bytes(
+        LETTER_A + (row + col + offset) % 26
+        for row in range(SCREEN_HEIGHT_TILES) for col in range(SCREEN_WIDTH_TILES)
+    )
+
+
+def test_overworld_tiles_are_not_text():
+    # Scrolling the map changes the rows the text box would occupy, but no box is open
+    before = snapshot(make_ram(overworld_tiles(0)))
+    after = snapshot(make_ram(overworld_tiles(1)))
+    assert before["text"] == after["text"] == ""
+
+    outcome = compare(before, after)
+    assert outcome["new_text"] == ""
+    assert not outcome["productive"]
+
+
+def test_text_box_is_read():
+    tiles = bytearray(overworld_tiles(0))
+    tiles[TEXT_BOX_TOP_ROW * SCREEN_WIDTH_TILES] = TEXT_BOX_CORNER_TILE
+    for row in (14, 16):
+        start = row * SCREEN_WIDTH_TILES
+        tiles[start + 1:start + SCREEN_WIDTH_TILES - 1] = bytes([0x7F] * (SCREEN_WIDTH_TILES - 2))
+    tiles[14 * SCREEN_WIDTH_TILES + 1:14 * SCREEN_WIDTH_TILES + 3] = bytes([LETTER_A + 7, LETTER_A + 8])
+
+    outcome = compare(snapshot(make_ram(overworld_tiles(0))), snapshot(make_ram(bytes(tiles))))
+    assert outcome["new_text"] == "HI"
+    assert outcome["productive"]
@@ -0,0 +1,77 @@
+from address_constants import (
+    EVENT_FLAGS_START_ADDRESS,
+    HP_ADDRESSES,
+    LEVELS_ADDRESSES,
+    MAX_HP_ADDRESSES,
+    PARTY_ADDRESSES,
+    PARTY_SIZE_ADDRESS,
+    WRAM_END_ADDRESS,
+    WRAM_START_ADDRESS,
+    X_POS_ADDRESS,
+)
+from memory_utils import RamSnapshot, get_first_pokemon_info, get_party
+from prompt_builder import PromptBuilder
+
+CHARMANDER, PIKACHU = 0xB0, 0x54
+
+
+def make_ram(party=()):
+    ram = bytearray(WRAM_END_ADDRESS - WRAM_START_ADDRESS)
+
+    def write(addr, value):
+        ram[addr - WRAM_START_ADDRESS] = value
+
+    write(PARTY_SIZE_ADDRESS, len(party))
+    for i, (species, level, hp, max_hp) in enumerate(party):
+        write(PARTY_ADDRESSES[i], species)
+        write(LEVELS_ADDRESSES[i], level)
+        write(HP_ADDRESSES[i], hp >> 8)
+        write(HP_ADDRESSES[i] + 1, hp & 0xFF)
+        write(MAX_HP_ADDRESSES[i], max_hp >> 8)
+        write(MAX_HP_ADDRESSES[i] + 1, max_hp & 0xFF)
+    return ram
+
+
+def test_party_uses_internal_species_index():
+    ram = RamSnapshot(bytes(make_ram([(CHARMANDER, 5, 20, 21), (PIKACHU, 12, 300, 301)])))
+    party = get_party(ram)
+    assert [p["species"] for p in party] == ["CHARMANDER", "PIKACHU"]
+    assert (party[1]["current_hp"], party[1]["max_hp"]) == (300, 301)
+
+
+def test_first_pokemon_info_reads_big_endian_hp():
+    ram = make_ram([(CHARMANDER, 5, 0, 0)])
+    ram[0xD16B - WRAM_START_ADDRESS] = CHARMANDER
+    ram[HP_ADDRESSES[0] - WRAM_START_ADDRESS:HP_ADDRESSES[0] - WRAM_START_ADDRESS + 2] = bytes([1, 2])
+    ram[MAX_HP_ADDRESSES[0] - WRAM_START_ADDRESS:MAX_HP_ADDRESSES[0] - WRAM_START_ADDRESS + 2] = bytes([1, 3])
+    info = get_first_pokemon_info(RamSnapshot(bytes(ram)))
+    assert (info["current_hp"], info["max_hp"]) == (0x102, 0x103)
+
+
+def test_prompt_names_starter():
+    block = PromptBuilder().build(bytes(make_ram([(CHARMANDER, 5, 20, 20)])))
+    assert "Party: CHARMANDER L5 20/20HP" in block
+
+
+def test_unchanged_lines_are_deduplicated():
+    builder = PromptBuilder()
+    ram = bytes(make_ram([(CHARMANDER, 5, 20, 20)]))
+    builder.build(ram)
+    assert builder.build(ram) == "Game state: unchanged."
+
+
+def test_flags_that_miss_the_budget_are_sent_later():
+    builder = PromptBuilder(token_budget=22)
+    assert "Event flags set: 0" in builder.build(bytes(make_ram()))
+
+    # Position and party change on the same turn and use up the budget before the flags
+    ram = make_ram([(CHARMANDER, 5, 20, 20)])
+    ram[X_POS_ADDRESS - WRAM_START_ADDRESS] = 9
+    for i in range(10):
+        ram[EVENT_FLAGS_START_ADDRESS - WRAM_START_ADDRESS + i] = 0xFF
+    first = builder.build(bytes(ram))
+    assert "Party: CHARMANDER" in first
+    assert "New event flags" not in first
+
+    later = builder.build(bytes(ram))
+    assert later == "Game state:\nNew event flags: 0, 1, 2, 3, 4, 5, 6, 7 (+72 more)"